@@ -1,9 +1,12 @@
 import os
 import re
+import time
+import asyncio
 import unicodedata
+from contextlib import asynccontextmanager
 from anyio import to_thread
 from typing import Iterable, List, Optional
-from llm import generate_answer, llm_ready, llm_healthcheck
+from llm import generate_answer_cached, llm_ready, llm_healthcheck, llm_cache_stats
 import numpy as np
 from dotenv import load_dotenv
 from pathlib import Path
@@ -20,13 +23,26 @@ from qdrant_utils import (
 )
 from fastapi.exceptions import RequestValidationError
 from qdrant_utils import delete_session
+import sessions
 
 
 
 def _env_list(name: str, default: str) -> List[str]:
     return [o.strip().rstrip("/") for o in os.getenv(name, default).split(",") if o.strip()]
 MIN_SIM = float(os.getenv("MIN_SIM", "0.10"))
-app = FastAPI(title="Chatbot API (Qdrant Cloud)", description="Czat + upload + embeddingi + CMS")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = asyncio.create_task(sessions.sweeper_loop(client)) if sessions.SESSION_TTL > 0 else None
+    yield
+    if task:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+app = FastAPI(title="Chatbot API (Qdrant Cloud)", description="Czat + upload + embeddingi + CMS", lifespan=lifespan)
 ALLOW_ORIGINS = _env_list(
     "ALLOW_ORIGINS",
     "http://127.0.0.1:5500,http://localhost:5500,https://prishchenko.github.io"
@@ -43,7 +59,7 @@ app.add_middleware(
 )
 @app.get("/llm-health")
 async def llm_health():
-    return llm_healthcheck()
+    return {**llm_healthcheck(), "cache": llm_cache_stats()}
 
 
 
@@ -86,6 +102,10 @@ client = connect(QDRANT_URL, QDRANT_API_KEY)
 ensure_collection(client, dim=VECTOR_DIM)
 ensure_payload_indexes(client)
 
+@app.get("/gc-stats")
+async def gc_stats():
+    return sessions.gc_stats()
+
 @app.delete("/purge")
 def purge(x_chat_id: Optional[str] = Header(default=None, alias="X-Chat-Id")):
     if not x_chat_id:
@@ -94,6 +114,7 @@ def purge(x_chat_id: Optional[str] = Header(default=None, alias="X-Chat-Id")):
         delete_session(client, x_chat_id)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Qdrant purge failed: {e}")
+    sessions.forget(x_chat_id)
     return {"ok": True, "purged_session": x_chat_id}
 
 def preprocess_text(text: str) -> str:
@@ -284,6 +305,7 @@ async def upload(file: UploadFile = File(...), x_chat_id: Optional[str] = Header
         text = preprocess_text(parse_bytes(file.filename, raw))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Nie udało się odczytać pliku: {e}")
+    await to_thread.run_sync(sessions.touch, client, x_chat_id or "default")
 
     chunks = split(text)
     if not chunks:
@@ -299,6 +321,7 @@ async def upload(file: UploadFile = File(...), x_chat_id: Optional[str] = Header
         "file_type": ftype,
         "chunk_id": i,
         "session_id": session_id,
+        "last_active": time.time(),
     } for i, c in enumerate(chunks)]
 
     await to_thread.run_sync(upsert_chunks, client, vecs, payloads)
@@ -317,6 +340,7 @@ async def cms_import(
     total_len = sum(len((it.text or "")) for it in body.items)
     if total_len > 5_000_000:
         raise HTTPException(status_code=413, detail="Za duży JSON (limit ~5 MB tekstu)")
+    await to_thread.run_sync(sessions.touch, client, session_id)
 
     all_chunks: List[str] = []
     payloads = []
@@ -332,6 +356,7 @@ async def cms_import(
             "file_type": "cms",
             "chunk_id": i,
             "session_id": session_id,
+            "last_active": time.time(),
         } for i, c in enumerate(cs)])
 
     if not all_chunks:
@@ -356,6 +381,7 @@ def likely_gibberish(s: str) -> bool:
 @app.post("/ask")
 def ask(payload: AskRequest, x_chat_id: Optional[str] = Header(default=None, alias="X-Chat-Id")):
     session_id = x_chat_id or "default"
+    sessions.touch(client, session_id)
 
     q = (payload.question or "").strip()
     if likely_gibberish(q):
@@ -409,7 +435,8 @@ def ask(payload: AskRequest, x_chat_id: Optional[str] = Header(default=None, ali
 
     candidate_contexts = [{
         "text": chosen_hit.payload.get("text", ""),
-        "source": chosen_source
+        "source": chosen_source,
+        "chunk_id": str(getattr(chosen_hit, "id", chosen_chunk)),
     }]
     sources_meta = [{
         "source": chosen_source,
@@ -417,16 +444,13 @@ def ask(payload: AskRequest, x_chat_id: Optional[str] = Header(default=None, ali
         "file_type": chosen_type,
         "score": round(chosen_score, 4),
     }]
-    if not llm_ready():
+    try:
+        raw_ans = (generate_answer_cached(q, candidate_contexts, ready=llm_ready) or "").strip()
+        if _near_identical(raw_ans, span or ""):
+            answer = _one_sentence_from_span(span or "", q)
+        else:
+            answer = polish_answer(raw_ans)
+    except Exception:
         answer = _one_sentence_from_span(span or (best_texts[0] if best_texts else ""), q)
-    else:
-        try:
-            raw_ans = (generate_answer(q, candidate_contexts) or "").strip()
-            if _near_identical(raw_ans, span or ""):
-                answer = _one_sentence_from_span(span or "", q)
-            else:
-                answer = polish_answer(raw_ans)
-        except Exception:
-            answer = _one_sentence_from_span(span or (best_texts[0] if best_texts else ""), q)
 
     return {"answer": answer, "sources": sources, "sources_meta": sources_meta}
\ No newline at end of file
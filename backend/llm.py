@@ -1,4 +1,5 @@
-import os, time, requests
+import os, re, time, hashlib, threading, requests
+from collections import OrderedDict
 
 def _clean(s: str) -> str:
     return (s or "").strip().strip('"').strip("'")
@@ -10,6 +11,8 @@ def _groq_key() -> str:
     return _clean(os.getenv("GROQ_API_KEY"))
 GROQ_MODEL = _clean(os.getenv("GROQ_MODEL") or "llama-3.1-8b-instant")
 LLM_TIMEOUT = int(os.getenv("HF_LLM_TIMEOUT", "90"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "600"))
+LLM_CACHE_MAX = int(os.getenv("LLM_CACHE_MAX", "512"))
 
 SYS_PROMPT = (
     "Przepisz podany fragment na 1–2 naturalne zdania po polsku, "
@@ -28,7 +31,7 @@ def _build_user_prompt(question: str, contexts: list[dict]) -> str:
         f"ODPOWIEDŹ (1–2 zdania):"
     )
 
-def generate_answer(question: str, contexts: list[dict]) -> str:
+def _complete(question: str, contexts: list[dict]) -> tuple[str, bool]:
     assert PROVIDER == "groq", "This llm.py is configured for Groq provider."
     key = _groq_key()
     if not key:
@@ -54,9 +57,12 @@ def generate_answer(question: str, contexts: list[dict]) -> str:
 
     data = r.json()
     try:
-        return (data["choices"][0]["message"]["content"] or "").strip()
+        return (data["choices"][0]["message"]["content"] or "").strip(), True
     except Exception:
-        return str(data)
+        return str(data), False
+
+def generate_answer(question: str, contexts: list[dict]) -> str:
+    return _complete(question, contexts)[0]
 
 def llm_ready(timeout_sec: int = 8) -> bool:
     try:
@@ -94,3 +100,94 @@ def llm_healthcheck() -> dict:
     except Exception as e:
         ms = round((time.time() - t0) * 1000)
         return {"ok": False, "status": 0, "ms": ms, "model": GROQ_MODEL, "error": str(e)}
+
+
+_cache: "OrderedDict[tuple, tuple[float, str]]" = OrderedDict()
+_inflight: dict[tuple, "_Flight"] = {}
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0, "shared": 0}
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: str | None = None
+        self.error: BaseException | None = None
+
+def _norm_question(q: str) -> str:
+    return re.sub(r"\s+", " ", (q or "")).strip().lower()
+
+def _cache_key(question: str, contexts: list[dict]) -> tuple:
+    h = hashlib.sha1()
+    for ctx in contexts or []:
+        h.update(str(ctx.get("chunk_id")).encode("utf-8") + b"\0")
+        h.update((ctx.get("text") or "").strip().encode("utf-8") + b"\0")
+    return (_norm_question(question), h.hexdigest(), GROQ_MODEL)
+
+def _cache_get(key: tuple) -> str | None:
+    item = _cache.get(key)
+    if item is None:
+        return None
+    ts, value = item
+    if time.monotonic() - ts > LLM_CACHE_TTL:
+        del _cache[key]
+        return None
+    _cache.move_to_end(key)
+    return value
+
+def _cache_put(key: tuple, value: str):
+    _cache[key] = (time.monotonic(), value)
+    _cache.move_to_end(key)
+    while len(_cache) > LLM_CACHE_MAX:
+        _cache.popitem(last=False)
+
+def _caching() -> bool:
+    return LLM_CACHE_TTL > 0 and LLM_CACHE_MAX > 0
+
+def generate_answer_cached(question: str, contexts: list[dict], ready=None) -> str:
+    key = _cache_key(question, contexts)
+    with _cache_lock:
+        hit = _cache_get(key) if _caching() else None
+        if hit is not None:
+            _cache_stats["hits"] += 1
+            return hit
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight()
+            _inflight[key] = flight
+            _cache_stats["misses"] += 1
+        else:
+            _cache_stats["shared"] += 1
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise RuntimeError("[LLM] współdzielone zapytanie nie powiodło się") from flight.error
+        return flight.result
+
+    try:
+        if ready is not None and not ready():
+            raise RuntimeError("[LLM] Groq niedostępny")
+        flight.result, ok = _complete(question, contexts)
+        if ok and _caching():
+            with _cache_lock:
+                _cache_put(key, flight.result)
+        return flight.result
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _cache_lock:
+            _inflight.pop(key, None)
+        flight.done.set()
+
+def llm_cache_stats() -> dict:
+    with _cache_lock:
+        return {
+            **_cache_stats,
+            "size": len(_cache),
+            "inflight": len(_inflight),
+            "ttl_sec": LLM_CACHE_TTL,
+            "max_size": LLM_CACHE_MAX,
+            "model": GROQ_MODEL,
+        }
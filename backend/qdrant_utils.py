@@ -2,11 +2,20 @@ import uuid
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams, PointStruct
 from qdrant_client.http.models import VectorParams as HttpVectorParams
-from qdrant_client.http.models import Filter, FieldCondition, MatchValue, PayloadSchemaType, FilterSelector
+from qdrant_client.http.models import (
+    Filter, FieldCondition, MatchValue, PayloadSchemaType, FilterSelector, Range,
+    MatchAny, IsEmptyCondition, PayloadField
+)
 
 COLLECTION = "chat_chunks"
-def delete_session(client, session_id: str):
-    f = Filter(must=[FieldCondition(key="session_id", match=MatchValue(value=session_id))])
+def _session_filter(session_id: str, before: float | None = None) -> Filter:
+    must = [FieldCondition(key="session_id", match=MatchValue(value=session_id))]
+    if before is not None:
+        must.append(FieldCondition(key="last_active", range=Range(lt=before)))
+    return Filter(must=must)
+
+def delete_session(client, session_id: str, before: float | None = None):
+    f = _session_filter(session_id, before)
     client.delete(
         collection_name=COLLECTION,
         points_selector=FilterSelector(filter=f),
@@ -24,6 +33,14 @@ def ensure_payload_indexes(client):
             )
         except Exception:
             pass
+    try:
+        client.create_payload_index(
+            collection_name=COLLECTION,
+            field_name="last_active",
+            field_schema=PayloadSchemaType.FLOAT
+        )
+    except Exception:
+        pass
 
 def ensure_collection(client, dim: int):
     cols = client.get_collections().collections
@@ -58,3 +75,42 @@ def search(client, vector, k: int = 8, session_id: str | None = None):
         with_payload=True,
         query_filter=qfilter
     )
+
+def touch_session(client, session_id: str, ts: float):
+    f = Filter(must=[FieldCondition(key="session_id", match=MatchValue(value=session_id))])
+    client.set_payload(
+        collection_name=COLLECTION,
+        payload={"last_active": ts},
+        points=f,
+        wait=False
+    )
+
+def backfill_last_active(client, ts: float):
+    f = Filter(must=[IsEmptyCondition(is_empty=PayloadField(key="last_active"))])
+    client.set_payload(
+        collection_name=COLLECTION,
+        payload={"last_active": ts},
+        points=f,
+        wait=True
+    )
+
+def expired_sessions(client, before: float, exclude: list[str] | None = None, limit: int = 256) -> list[str]:
+    must_not = [FieldCondition(key="session_id", match=MatchAny(any=list(exclude)))] if exclude else None
+    f = Filter(must=[FieldCondition(key="last_active", range=Range(lt=before))], must_not=must_not)
+    points, _ = client.scroll(
+        collection_name=COLLECTION,
+        scroll_filter=f,
+        limit=limit,
+        with_payload=["session_id"],
+        with_vectors=False
+    )
+    seen = []
+    for p in points:
+        sid = (p.payload or {}).get("session_id")
+        if sid and sid not in seen:
+            seen.append(sid)
+    return seen
+
+def session_points_count(client, session_id: str, before: float | None = None) -> int:
+    f = _session_filter(session_id, before)
+    return int(client.count(collection_name=COLLECTION, count_filter=f, exact=True).count)
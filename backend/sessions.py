@@ -0,0 +1,116 @@
+import os, time, asyncio, threading
+from anyio import to_thread
+from qdrant_utils import (
+    delete_session, touch_session, expired_sessions,
+    session_points_count, backfill_last_active
+)
+
+SESSION_TTL = int(os.getenv("SESSION_TTL", "0"))
+SESSION_TOUCH_INTERVAL = int(os.getenv("SESSION_TOUCH_INTERVAL", "60"))
+SESSION_GC_INTERVAL = int(os.getenv("SESSION_GC_INTERVAL", "900"))
+SESSION_GC_BATCH = int(os.getenv("SESSION_GC_BATCH", "20"))
+SESSION_GC_PAUSE = float(os.getenv("SESSION_GC_PAUSE", "1.0"))
+SESSION_PROTECTED = [s.strip() for s in os.getenv("SESSION_PROTECTED", "default").split(",") if s.strip()]
+
+_last_seen: dict[str, float] = {}
+_last_persisted: dict[str, float] = {}
+_lock = threading.Lock()
+_stats = {
+    "runs": 0,
+    "sessions_deleted": 0,
+    "sessions_skipped": 0,
+    "points_reclaimed": 0,
+    "last_run_at": None,
+    "last_run_ms": None,
+    "last_error": None,
+}
+
+def touch(client, session_id: str):
+    if SESSION_TTL <= 0:
+        return
+    now = time.time()
+    with _lock:
+        _last_seen[session_id] = now
+        if now - _last_persisted.get(session_id, 0.0) < SESSION_TOUCH_INTERVAL:
+            return
+        _last_persisted[session_id] = now
+    try:
+        touch_session(client, session_id, now)
+    except Exception:
+        with _lock:
+            _last_persisted.pop(session_id, None)
+
+def forget(session_id: str):
+    with _lock:
+        _last_seen.pop(session_id, None)
+        _last_persisted.pop(session_id, None)
+
+def _recently_seen(session_id: str, cutoff: float) -> bool:
+    with _lock:
+        return _last_seen.get(session_id, 0.0) >= cutoff
+
+def _prune(cutoff: float):
+    with _lock:
+        for sid in [s for s, ts in _last_seen.items() if ts < cutoff]:
+            _last_seen.pop(sid, None)
+            _last_persisted.pop(sid, None)
+
+def backfill(client):
+    # Chunks stored before activity tracking have no last_active; start their TTL now.
+    backfill_last_active(client, time.time())
+
+async def sweep(client) -> dict:
+    t0 = time.time()
+    cutoff = t0 - SESSION_TTL
+    _prune(cutoff)
+    await to_thread.run_sync(backfill, client)
+    deleted, reclaimed = 0, 0
+    skipped: list[str] = []
+    while True:
+        exclude = SESSION_PROTECTED + skipped
+        batch = await to_thread.run_sync(expired_sessions, client, cutoff, exclude)
+        if not batch:
+            break
+        for sid in batch[:SESSION_GC_BATCH]:
+            if _recently_seen(sid, cutoff):
+                skipped.append(sid)
+                continue
+            # Only chunks still older than the cutoff are removed, so activity
+            # persisted by another worker in the meantime keeps the session.
+            n = await to_thread.run_sync(session_points_count, client, sid, cutoff)
+            await to_thread.run_sync(delete_session, client, sid, cutoff)
+            if n:
+                forget(sid)
+                deleted += 1
+                reclaimed += n
+        await asyncio.sleep(SESSION_GC_PAUSE)
+
+    with _lock:
+        _stats["runs"] += 1
+        _stats["sessions_deleted"] += deleted
+        _stats["sessions_skipped"] += len(skipped)
+        _stats["points_reclaimed"] += reclaimed
+        _stats["last_run_at"] = round(t0)
+        _stats["last_run_ms"] = round((time.time() - t0) * 1000)
+        _stats["last_error"] = None
+    return {"sessions_deleted": deleted, "sessions_skipped": len(skipped), "points_reclaimed": reclaimed}
+
+async def sweeper_loop(client):
+    while True:
+        try:
+            await sweep(client)
+        except Exception as e:
+            with _lock:
+                _stats["last_error"] = str(e)
+        await asyncio.sleep(SESSION_GC_INTERVAL)
+
+def gc_stats() -> dict:
+    with _lock:
+        return {
+            **_stats,
+            "tracked_sessions": len(_last_seen),
+            "ttl_sec": SESSION_TTL,
+            "interval_sec": SESSION_GC_INTERVAL,
+            "batch": SESSION_GC_BATCH,
+            "protected": SESSION_PROTECTED,
+        }